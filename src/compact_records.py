@@ -0,0 +1,297 @@
+"""Compact in-memory representation of colrev record dicts.
+
+Loading a curation yields one dict per record, each with its own hash table,
+repeated field names, one str object per value and large (JATS-tagged)
+abstracts. CompactRecord stores a record in a few flat objects instead:
+
+- the field names (interned) live in a Layout shared by all records with the
+  same fields, so the per-record cost of a field is one offset
+- string values are concatenated into a single UTF-8 bytes object (prefixed
+  with their end offsets), which is zlib-compressed unless it is short and
+  sliced (decoded) on access
+- ENTRYTYPE and colrev_status are stored as small integer codes
+- abstract/fulltext are compressed separately, so they are only decompressed
+  when they are accessed
+- other values (colrev_origin lists, provenance dicts, ...) are kept as they are
+
+CompactRecord behaves like a (mutable) mapping (rec.get(), rec[...],
+"field" in rec etc.), but each access to a str value decompresses the
+record's text, so it suits records that are kept long and read rarely.
+items() and values() decode the record once; loops that read many fields of
+a record should use them (or to_dict()). Use to_dict() or expand_records()
+whenever a colrev/bib_dedupe function needs plain dicts; the conversion is
+lossless (field order, value types and enum members are preserved).
+"""
+
+from __future__ import annotations
+
+import sys
+import weakref
+import zlib
+from array import array
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, ItemsView, Iterable, Iterator, List, Tuple, ValuesView
+
+from colrev.constants import RecordState
+
+
+ENTRYTYPES = (
+    "article",
+    "inproceedings",
+    "incollection",
+    "inbook",
+    "book",
+    "proceedings",
+    "phdthesis",
+    "mastersthesis",
+    "techreport",
+    "unpublished",
+    "online",
+    "misc",
+)
+RECORD_STATES = tuple(RecordState)
+
+COMPRESSED_FIELDS = frozenset({"abstract", "fulltext"})
+# Typecode for the text end offsets (at least 32 bits; "I" is 16 bits on some platforms)
+OFFSET_TYPECODE = "I" if array("I").itemsize >= 4 else "L"
+# Short values do not get smaller when compressed
+MIN_COMPRESSED_LENGTH = 200
+# Preset dictionary with strings that recur across records (but rarely within
+# one record), so that zlib can compress the short per-record values
+ZDICT = (
+    b'<jats:title content-type="abstract-heading"><jats:p><jats:sec><jats:italic>'
+    b"https://dblp.org/rec/conf/https://dblp.org/rec/journals/"
+    b"https://github.com/CoLRev-curations/https://aisel.aisnet.org/https://doi.org/"
+    b"Hawaii International Conference on System Sciences"
+    b"International Conference on Information Systems"
+    b"European Conference on Information Systems"
+    b"Americas Conference on Information Systems"
+    b"Communications of the Association for Information Systems"
+    b"Pacific Asia Conference on Information Systems"
+    b"Journal of the Association for Information Systems"
+    b"FalseTrue A Systematic Literature Reviewliterature review"
+)
+
+
+class _Compressed(bytes):
+    """Marks zlib-compressed data (a str value or the text of a record)."""
+
+    __slots__ = ()
+
+
+class _EntryTypeCode(int):
+    __slots__ = ()
+
+
+class _StatusCode(int):
+    __slots__ = ()
+
+
+# Shared code objects (one per value), so that coded fields cost no memory per record
+_ENTRYTYPE_CODES = {entrytype: _EntryTypeCode(code) for code, entrytype in enumerate(ENTRYTYPES)}
+_STATUS_CODES = {state: _StatusCode(code) for code, state in enumerate(RECORD_STATES)}
+
+
+class Layout:
+    """Field names of a record and where each value is stored.
+
+    slots[i] is the index of field i in the text offsets (is_text[i]) or in
+    the tuple of other values (not is_text[i]).
+    """
+
+    __slots__ = ("fields", "is_text", "slots", "positions", "nr_text", "__weakref__")
+
+    def __init__(self, fields: Tuple[str, ...], is_text: Tuple[bool, ...]) -> None:
+        self.fields = tuple(sys.intern(field) for field in fields)
+        self.is_text = is_text
+        nr_text = nr_other = 0
+        slots = []
+        for text in is_text:
+            if text:
+                slots.append(nr_text)
+                nr_text += 1
+            else:
+                slots.append(nr_other)
+                nr_other += 1
+        self.slots = tuple(slots)
+        self.nr_text = nr_text
+        self.positions = {field: i for i, field in enumerate(self.fields)}
+
+
+# Layouts shared by all records with the same fields (in the same order); a
+# layout is dropped once no record uses it (e.g., after setitem/delitem)
+_LAYOUTS: weakref.WeakValueDictionary[
+    Tuple[Tuple[str, ...], Tuple[bool, ...]], Layout
+] = weakref.WeakValueDictionary()
+
+
+def _layout(fields: Tuple[str, ...], is_text: Tuple[bool, ...]) -> Layout:
+    layout = _LAYOUTS.get((fields, is_text))
+    if layout is None:
+        layout = Layout(fields, is_text)
+        _LAYOUTS[(layout.fields, is_text)] = layout
+    return layout
+
+
+def _compress(data: bytes) -> _Compressed:
+    compressor = zlib.compressobj(zdict=ZDICT)
+    return _Compressed(compressor.compress(data) + compressor.flush())
+
+
+def _decompress(data: _Compressed) -> bytes:
+    return zlib.decompressobj(zdict=ZDICT).decompress(data)
+
+
+def _encode(field: str, value: object) -> object:
+    """Return the encoded value (a str is stored in the text blob)."""
+    # Codes are only used for exact types so that decoding returns the original value
+    if type(value) is str:
+        if field == "ENTRYTYPE" and value in _ENTRYTYPE_CODES:
+            return _ENTRYTYPE_CODES[value]
+        if field in COMPRESSED_FIELDS and len(value) >= MIN_COMPRESSED_LENGTH:
+            return _compress(value.encode("utf-8"))
+    elif type(value) is RecordState:
+        return _STATUS_CODES[value]
+    return value
+
+
+def _decode(value: object) -> object:
+    if type(value) is _EntryTypeCode:
+        return ENTRYTYPES[value]
+    if type(value) is _StatusCode:
+        return RECORD_STATES[value]
+    if type(value) is _Compressed:
+        return _decompress(value).decode("utf-8")
+    return value
+
+
+def _slice(ends: array, text: bytes, slot: int) -> str:
+    start = ends[slot - 1] if slot else 0
+    return text[start : ends[slot]].decode("utf-8")
+
+
+class CompactRecord(MutableMapping):
+    """A colrev record dict stored as (shared layout, text data, other values)."""
+
+    __slots__ = ("_layout", "_data", "_other")
+
+    def __init__(self, record_dict: Mapping) -> None:
+        self._pack(tuple(record_dict), [_encode(f, v) for f, v in record_dict.items()])
+
+    def _pack(self, fields: Tuple[str, ...], values: List[object]) -> None:
+        is_text = tuple(type(value) is str for value in values)
+        texts = [value.encode("utf-8") for value in values if type(value) is str]
+        ends = array(OFFSET_TYPECODE)
+        end = 0
+        for text in texts:
+            end += len(text)
+            ends.append(end)
+        data = ends.tobytes() + b"".join(texts)
+        if len(data) >= MIN_COMPRESSED_LENGTH:
+            data = _compress(data)
+        self._layout = _layout(fields, is_text)
+        self._data = data
+        self._other = tuple(value for value in values if type(value) is not str)
+
+    def _texts(self) -> Tuple[array, bytes]:
+        """Return the end offsets and the concatenated text values."""
+        data = self._data
+        if type(data) is _Compressed:
+            data = _decompress(data)
+        nr_text = self._layout.nr_text
+        ends = array(OFFSET_TYPECODE)
+        header = ends.itemsize * nr_text
+        ends.frombytes(data[:header])
+        if len(ends) != nr_text:
+            raise ValueError(f"Record data has {len(ends)} text offsets, expected {nr_text}")
+        return ends, data[header:]
+
+    def _encoded_values(self) -> List[object]:
+        layout = self._layout
+        ends, text = self._texts()
+        return [
+            _slice(ends, text, slot) if is_text else self._other[slot]
+            for is_text, slot in zip(layout.is_text, layout.slots)
+        ]
+
+    @classmethod
+    def from_dict(cls, record_dict: Mapping) -> "CompactRecord":
+        return cls(record_dict)
+
+    def to_dict(self) -> dict:
+        return {
+            field: _decode(value)
+            for field, value in zip(self._layout.fields, self._encoded_values())
+        }
+
+    def __getitem__(self, field: str) -> object:
+        layout = self._layout
+        i = layout.positions[field]
+        if layout.is_text[i]:
+            return _slice(*self._texts(), layout.slots[i])
+        return _decode(self._other[layout.slots[i]])
+
+    def __setitem__(self, field: str, value: object) -> None:
+        fields = self._layout.fields
+        values = self._encoded_values()
+        i = self._layout.positions.get(field)
+        if i is None:
+            fields += (field,)
+            values.append(_encode(field, value))
+        else:
+            values[i] = _encode(field, value)
+        self._pack(fields, values)
+
+    def __delitem__(self, field: str) -> None:
+        fields = self._layout.fields
+        i = self._layout.positions[field]
+        values = self._encoded_values()
+        del values[i]
+        self._pack(fields[:i] + fields[i + 1 :], values)
+
+    def items(self) -> ItemsView[str, object]:
+        # Decode the record once (instead of once per value)
+        return self.to_dict().items()
+
+    def values(self) -> ValuesView[object]:
+        return self.to_dict().values()
+
+    def __contains__(self, field: object) -> bool:
+        return field in self._layout.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout.fields)
+
+    def __len__(self) -> int:
+        return len(self._layout.fields)
+
+    def __repr__(self) -> str:
+        return f"CompactRecord({self.to_dict()!r})"
+
+
+def compact_records(
+    records: Dict[str, Mapping], drop_fields: Iterable[str] = (), release: bool = False
+) -> Dict[str, CompactRecord]:
+    """Convert a colrev records dict (ID -> record dict) to compact records.
+
+    Fields in drop_fields (e.g., provenance fields that are not needed) are
+    not kept in the compact records. With release=True, each record dict is
+    removed from records once it is converted, so that the loaded dicts can be
+    freed during the conversion (instead of after it).
+    """
+    drop_fields = frozenset(drop_fields)
+    compacted = {}
+    for rec_id in list(records):
+        record_dict = records.pop(rec_id) if release else records[rec_id]
+        if drop_fields:
+            record_dict = {f: v for f, v in record_dict.items() if f not in drop_fields}
+        compacted[sys.intern(rec_id)] = CompactRecord(record_dict)
+    return compacted
+
+
+def expand_records(records: Mapping[str, Mapping]) -> Dict[str, dict]:
+    """Convert compact records back to a colrev records dict."""
+    return {
+        rec_id: rec.to_dict() if isinstance(rec, CompactRecord) else dict(rec)
+        for rec_id, rec in records.items()
+    }
@@ -248,7 +248,6 @@ def main(bib_filename: str, output_dir: str = "papers") -> None:
     count = 0
 
     for key, rec in iter_records(records):
-        rec = dict(rec)
         if rec["colrev_status"] != RecordState.rev_synthesized:
             continue
 
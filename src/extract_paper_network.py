@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""Extract the review-to-review citation network from records.bib.
+
+- Loads records.bib with colrev and keeps the synthesized reviews as nodes
+- Collects each review's references from cached Crossref reference lists
+  (data/crossref_references/) and from the TEI references of its PDF (stored
+  next to the PDF in data/.tei/, created with GROBID if it does not exist)
+- Resolves references against the LR database by normalized DOI and title key
+- Stores the graph in CSR form (data/paper_network.npz) together with the
+  extracted reference keys and their sources (DOI, PDF/TEI file, cached
+  Crossref list), so later runs only extract references for records that are
+  new or whose sources changed
+- Writes degree and PageRank metrics to data/paper_network_metrics.csv
+
+Use --fetch to query Crossref for DOIs that are not cached yet and --rebuild
+to ignore the stored network and extract all references again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+import colrev.loader.load_utils
+import colrev.env.environment_manager
+import colrev.env.tei_parser
+from colrev.constants import RecordState
+from colrev.packages.crossref.src.crossref_api import Endpoint
+
+from citations import normalize_doi
+from compact_records import CompactRecord
+
+
+RECORDS_FILE = Path("data/records.bib")
+CROSSREF_CACHE_DIR = Path("data/crossref_references")
+NETWORK_FILE = Path("data/paper_network.npz")
+METRICS_FILE = Path("data/paper_network_metrics.csv")
+
+# Shorter titles ("Introduction", "Editorial", ...) are too generic to match on
+MIN_TITLE_KEY_LENGTH = 20
+
+# (doi_key, file, Crossref list cached) that the references of a record were extracted from
+Source = Tuple[str, str, bool]
+
+
+def doi_key(doi: Optional[str]) -> str:
+    """Return the DOI in the form used for matching ("" if missing)."""
+    if not doi:
+        return ""
+    return normalize_doi(str(doi)).lower()
+
+
+def title_key(title: Optional[str]) -> str:
+    """Return the title in the form used for matching ("" if too short)."""
+    if not title:
+        return ""
+    key = re.sub(r"[^a-z0-9]", "", str(title).lower())
+    if len(key) < MIN_TITLE_KEY_LENGTH:
+        return ""
+    return key
+
+
+class CSRGraph:
+    """Directed graph over record IDs in compressed sparse row form.
+
+    Row i of (indptr, indices) lists the nodes cited by node i. The raw
+    reference keys of each node are kept in the same layout (ref_indptr,
+    ref_dois, ref_titles) so that edges can be re-resolved when records are
+    added without extracting the references again. source_dois, source_files
+    and source_crossref record what the references of each node were
+    extracted from.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        ref_indptr: np.ndarray,
+        ref_dois: np.ndarray,
+        ref_titles: np.ndarray,
+        source_dois: np.ndarray,
+        source_files: np.ndarray,
+        source_crossref: np.ndarray,
+    ) -> None:
+        self.ids = ids
+        self.indptr = indptr
+        self.indices = indices
+        self.ref_indptr = ref_indptr
+        self.ref_dois = ref_dois
+        self.ref_titles = ref_titles
+        self.source_dois = source_dois
+        self.source_files = source_files
+        self.source_crossref = source_crossref
+
+    @property
+    def nr_nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nr_edges(self) -> int:
+        return len(self.indices)
+
+    def references(self) -> Dict[str, List[Tuple[str, str]]]:
+        """Return the stored (doi_key, title_key) references per record ID."""
+        return {
+            str(rec_id): list(
+                zip(
+                    self.ref_dois[start:end].tolist(),
+                    self.ref_titles[start:end].tolist(),
+                )
+            )
+            for rec_id, start, end in zip(
+                self.ids, self.ref_indptr[:-1], self.ref_indptr[1:]
+            )
+        }
+
+    def sources(self) -> Dict[str, Source]:
+        """Return the stored reference sources per record ID."""
+        return {
+            rec_id: (source_doi, source_file, source_crossref)
+            for rec_id, source_doi, source_file, source_crossref in zip(
+                self.ids.tolist(),
+                self.source_dois.tolist(),
+                self.source_files.tolist(),
+                self.source_crossref.tolist(),
+            )
+        }
+
+    def save(self, path: Path) -> None:
+        np.savez_compressed(
+            path,
+            ids=self.ids,
+            indptr=self.indptr,
+            indices=self.indices,
+            ref_indptr=self.ref_indptr,
+            ref_dois=self.ref_dois,
+            ref_titles=self.ref_titles,
+            source_dois=self.source_dois,
+            source_files=self.source_files,
+            source_crossref=self.source_crossref,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "CSRGraph":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                ids=data["ids"],
+                indptr=data["indptr"],
+                indices=data["indices"],
+                ref_indptr=data["ref_indptr"],
+                ref_dois=data["ref_dois"],
+                ref_titles=data["ref_titles"],
+                source_dois=data["source_dois"],
+                source_files=data["source_files"],
+                source_crossref=data["source_crossref"],
+            )
+
+
+def crossref_cache_path(doi: str) -> Path:
+    return CROSSREF_CACHE_DIR / f"{quote(doi, safe='')}.json"
+
+
+def fetch_crossref_references(doi: str) -> Optional[List[dict]]:
+    """Return the Crossref reference list for a DOI, or None."""
+    _, email = colrev.env.environment_manager.EnvironmentManager.get_name_mail_from_git()
+    endpoint = Endpoint(f"https://api.crossref.org/works/{doi}", email=email)
+
+    try:
+        message = next(iter(endpoint))  # type: ignore[assignment]
+    except StopIteration:
+        return None
+    except Exception as exc:  # network issues, etc.
+        print(f"Warning: error querying Crossref for DOI {doi}: {exc}")
+        return None
+
+    if not isinstance(message, dict):
+        return None
+    return message.get("reference", [])
+
+
+def get_crossref_references(doi: str, fetch: bool) -> List[Tuple[str, str]]:
+    """Return (doi_key, title_key) pairs from the (cached) Crossref references."""
+    if not doi:
+        return []
+
+    cache_path = crossref_cache_path(doi)
+    if cache_path.is_file():
+        references = json.loads(cache_path.read_text(encoding="utf-8"))
+    elif fetch:
+        print(f"Querying Crossref references for DOI {doi} ...")
+        references = fetch_crossref_references(doi)
+        if references is None:
+            return []
+        CROSSREF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(references), encoding="utf-8")
+    else:
+        return []
+
+    return [
+        (doi_key(ref.get("DOI")), title_key(ref.get("article-title")))
+        for ref in references
+    ]
+
+
+def tei_path(pdf_file: Path) -> Path:
+    """Return the path of the TEI file (data/pdfs/X.pdf -> data/.tei/X.tei.xml)."""
+    return Path(str(pdf_file).replace("pdfs/", ".tei/").replace(".pdf", ".tei.xml"))
+
+
+def get_tei_references(rec: Mapping) -> List[Tuple[str, str]]:
+    """Return (doi_key, title_key) pairs from the TEI references of the PDF."""
+    if "file" not in rec:
+        return []
+    pdf_file = Path(rec["file"])
+    tei_file = tei_path(pdf_file)
+    try:
+        # Read the stored TEI (only run GROBID and store the TEI if it does not exist)
+        if tei_file.is_file():
+            tei_object = colrev.env.tei_parser.TEIParser(tei_path=tei_file)
+        elif pdf_file.is_file():
+            tei_file.parent.mkdir(parents=True, exist_ok=True)
+            tei_object = colrev.env.tei_parser.TEIParser(pdf_path=pdf_file, tei_path=tei_file)
+        else:
+            return []
+        references = tei_object.get_references()
+    except Exception as exc:
+        print(f"Warning: could not parse TEI references for {rec['ID']}: {exc}")
+        return []
+
+    return [(doi_key(ref.get("doi")), title_key(ref.get("title"))) for ref in references]
+
+
+def extract_references(rec: Mapping, fetch: bool) -> List[Tuple[str, str]]:
+    """Return the distinct, non-empty reference keys of a record."""
+    references = get_crossref_references(doi_key(rec.get("doi")), fetch=fetch)
+    references += get_tei_references(rec)
+    return [ref for ref in dict.fromkeys(references) if ref != ("", "")]
+
+
+def reference_source(rec: Mapping) -> Source:
+    """Return what the references of a record are currently extracted from."""
+    doi = doi_key(rec.get("doi"))
+    file = str(rec.get("file", ""))
+    # A file that is not available (yet) is not a source
+    if file and not (Path(file).is_file() or tei_path(Path(file)).is_file()):
+        file = ""
+    return doi, file, bool(doi) and crossref_cache_path(doi).is_file()
+
+
+def needs_extraction(
+    rec: Mapping,
+    stored_references: Optional[List[Tuple[str, str]]],
+    stored_source: Optional[Source],
+    fetch: bool,
+) -> bool:
+    """Return whether the stored references of a record are missing or outdated.
+
+    References (including an empty list) that were extracted from the same
+    sources are up to date, so that GROBID/Crossref are not queried again.
+    """
+    if stored_references is None or stored_source is None:
+        return True
+    doi, file, crossref_cached = reference_source(rec)
+    if (doi, file, crossref_cached) != stored_source:
+        return True
+    # The Crossref list was not cached (and would be fetched now)
+    return fetch and bool(doi) and not crossref_cached
+
+
+def build_graph(
+    records: Dict[str, Mapping],
+    references: Dict[str, List[Tuple[str, str]]],
+    sources: Optional[Dict[str, Source]] = None,
+) -> CSRGraph:
+    """Resolve the references against the records and return the CSR graph."""
+    sources = sources or {}
+    ids = sorted(records)
+    node_index = {rec_id: i for i, rec_id in enumerate(ids)}
+
+    doi_index: Dict[str, int] = {}
+    title_index: Dict[str, int] = {}
+    ambiguous_titles = set()
+    for rec_id in ids:
+        rec = records[rec_id]
+        if doi := doi_key(rec.get("doi")):
+            doi_index[doi] = node_index[rec_id]
+        if title := title_key(rec.get("title")):
+            if title in title_index:
+                ambiguous_titles.add(title)
+            title_index[title] = node_index[rec_id]
+    for title in ambiguous_titles:
+        del title_index[title]
+
+    indptr = [0]
+    indices: List[int] = []
+    ref_indptr = [0]
+    ref_dois: List[str] = []
+    ref_titles: List[str] = []
+    for rec_id in ids:
+        source = node_index[rec_id]
+        targets = set()
+        for ref_doi, ref_title in references.get(rec_id, []):
+            target = doi_index.get(ref_doi) if ref_doi else None
+            if target is None and ref_title:
+                target = title_index.get(ref_title)
+            if target is not None and target != source:
+                targets.add(target)
+            ref_dois.append(ref_doi)
+            ref_titles.append(ref_title)
+        indices.extend(sorted(targets))
+        indptr.append(len(indices))
+        ref_indptr.append(len(ref_dois))
+
+    node_sources = [sources.get(rec_id, ("", "", False)) for rec_id in ids]
+    return CSRGraph(
+        ids=np.array(ids, dtype=str),
+        indptr=np.array(indptr, dtype=np.int64),
+        indices=np.array(indices, dtype=np.int32),
+        ref_indptr=np.array(ref_indptr, dtype=np.int64),
+        ref_dois=np.array(ref_dois, dtype=str),
+        ref_titles=np.array(ref_titles, dtype=str),
+        source_dois=np.array([source[0] for source in node_sources], dtype=str),
+        source_files=np.array([source[1] for source in node_sources], dtype=str),
+        source_crossref=np.array([source[2] for source in node_sources], dtype=bool),
+    )
+
+
+def pagerank(
+    graph: CSRGraph, damping: float = 0.85, tol: float = 1e-10, max_iter: int = 100
+) -> np.ndarray:
+    """Return the PageRank scores of the nodes (power iteration)."""
+    n = graph.nr_nodes
+    if n == 0:
+        return np.zeros(0)
+
+    out_degree = np.diff(graph.indptr)
+    sources = np.repeat(np.arange(n), out_degree)
+    weights = 1.0 / out_degree[sources]
+    dangling = out_degree == 0
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        received = np.bincount(graph.indices, weights=rank[sources] * weights, minlength=n)
+        new_rank = (1.0 - damping) / n + damping * (received + rank[dangling].sum() / n)
+        converged = np.abs(new_rank - rank).sum() < tol
+        rank = new_rank
+        if converged:
+            break
+    return rank
+
+
+def compute_metrics(graph: CSRGraph) -> Dict[str, np.ndarray]:
+    return {
+        "in_degree": np.bincount(graph.indices, minlength=graph.nr_nodes),
+        "out_degree": np.diff(graph.indptr),
+        "pagerank": pagerank(graph),
+    }
+
+
+def write_metrics(graph: CSRGraph, metrics: Dict[str, np.ndarray], filename: Path) -> None:
+    with filename.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ID", *metrics])
+        for i, rec_id in enumerate(graph.ids.tolist()):
+            writer.writerow([rec_id, *(values[i] for values in metrics.values())])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--fetch",
+        action="store_true",
+        help="Query Crossref for reference lists that are not cached yet",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore the stored network and extract all references again",
+    )
+    args = parser.parse_args()
+
+    if not RECORDS_FILE.is_file():
+        raise SystemExit(f"File not found: {RECORDS_FILE}")
+
+    print(f"Loading records from {RECORDS_FILE} ...")
+    records = {
+        rec_id: CompactRecord(rec)
+        for rec_id, rec in colrev.loader.load_utils.load(filename=RECORDS_FILE).items()
+        if rec["colrev_status"] == RecordState.rev_synthesized
+    }
+
+    references: Dict[str, List[Tuple[str, str]]] = {}
+    sources: Dict[str, Source] = {}
+    if NETWORK_FILE.is_file() and not args.rebuild:
+        stored_graph = CSRGraph.load(NETWORK_FILE)
+        references = stored_graph.references()
+        sources = stored_graph.sources()
+        print(f"Loaded stored references for {len(references)} records")
+
+    extract_ids = [
+        rec_id
+        for rec_id, rec in records.items()
+        if needs_extraction(rec, references.get(rec_id), sources.get(rec_id), args.fetch)
+    ]
+    for rec_id in extract_ids:
+        references[rec_id] = extract_references(records[rec_id], fetch=args.fetch)
+        sources[rec_id] = reference_source(records[rec_id])
+    print(f"Extracted references for {len(extract_ids)} records")
+
+    start = time.perf_counter()
+    graph = build_graph(records, references, sources)
+    metrics = compute_metrics(graph)
+    elapsed = time.perf_counter() - start
+
+    graph.save(NETWORK_FILE)
+    write_metrics(graph, metrics, METRICS_FILE)
+
+    top = np.argsort(metrics["pagerank"])[::-1][:10]
+    print(
+        f"\nDone building the citation network ({elapsed:.2f}s).\n"
+        f"  Nodes: {graph.nr_nodes}\n"
+        f"  Edges: {graph.nr_edges}\n"
+        f"  Reviews citing other reviews: {int((metrics['out_degree'] > 0).sum())}\n"
+        f"  Reviews cited by other reviews: {int((metrics['in_degree'] > 0).sum())}\n"
+        f"  Top reviews by PageRank:"
+    )
+    for i in top:
+        print(
+            f"    {graph.ids[i]}: pagerank={metrics['pagerank'][i]:.5f}, "
+            f"in_degree={metrics['in_degree'][i]}"
+        )
+    print(f"\nWrote {NETWORK_FILE} and {METRICS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
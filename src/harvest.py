@@ -67,6 +67,10 @@ def import_lrs_from_curation():
         review_manager = colrev.review_manager.ReviewManager(path_str=curation)
         colrev.ops.check.CheckOperation(review_manager)
         records = review_manager.dataset.load_records_dict()
+        # Provenance fields are not needed (and not imported into the LR database)
+        for record_dict in records.values():
+            for field in ("colrev_origin", "colrev_masterdata_provenance", "colrev_data_provenance"):
+                record_dict.pop(field, None)
 
         for record_dict in records.values():
             if Fields.YEAR not in record_dict:
@@ -117,11 +121,11 @@ def import_lrs_from_curation():
                     continue
                 print(f'Import {record_dict[Fields.ID]}')
                 record_dict["colrev_status"] = "md_processed"
-                record_dict.pop("colrev_origin", None)
-                record_dict.pop("colrev_masterdata_provenance", None)
-                record_dict.pop("colrev_data_provenance", None)
                 records_lr_is[record_dict[Fields.ID]] = record_dict
 
+        # Release the curation before the next one is loaded
+        del records
+
     # for harvested_record in harvested_records:
 
     # print()
@@ -0,0 +1,160 @@
+import gc
+from pathlib import Path
+
+import pytest
+
+import colrev.loader.load_utils
+from colrev.constants import RecordState
+
+import compact_records as compact_records_module
+from compact_records import CompactRecord, compact_records, expand_records
+
+RECORDS_FILE = Path(__file__).parents[1] / "data" / "records.bib"
+
+JATS_ABSTRACT = (
+    '<jats:title content-type="abstract-heading">Purpose – The purpose of this paper is to '
+    "comprehensively review existing literature regarding the ethical dilemmas posed by "
+    "location-based services (LBS) and their impact upon the adoption of a regulatory framework."
+)
+
+RECORD = {
+    "ID": "Abbas2014",
+    "ENTRYTYPE": "article",
+    "colrev_status": RecordState.rev_synthesized,
+    "colrev_origin": ["crossref.bib/000123", "dblp.bib/000456"],
+    "colrev_masterdata_provenance": {"author": {"source": "crossref.bib/000123", "note": ""}},
+    "doi": "10.1108/ITP-12-2012-0156",
+    "author": "Abbas, Roba and Michael, Katina and Michael, MG",
+    "title": "The regulatory considerations and ethical dilemmas of location-based services (LBS)",
+    "year": "2014",
+    "abstract": JATS_ABSTRACT,
+    "cited_by": 42,
+    "language": "",
+}
+
+
+def assert_identical(converted: dict, record_dict: dict) -> None:
+    assert list(converted.items()) == list(record_dict.items())
+    for field, value in record_dict.items():
+        assert type(converted[field]) is type(value), field
+
+
+def test_round_trip():
+    rec = CompactRecord(RECORD)
+
+    assert_identical(rec.to_dict(), RECORD)
+    assert list(rec) == list(RECORD)
+    assert rec["colrev_status"] is RecordState.rev_synthesized
+    assert rec["abstract"] == JATS_ABSTRACT
+    assert rec["colrev_origin"] is RECORD["colrev_origin"]
+    assert rec == RECORD
+
+
+def test_items_values_decode_once(monkeypatch):
+    rec = CompactRecord(RECORD)
+    calls = []
+    texts = CompactRecord._texts
+
+    def count_texts(self):
+        calls.append(self)
+        return texts(self)
+
+    monkeypatch.setattr(CompactRecord, "_texts", count_texts)
+
+    assert list(rec.items()) == list(RECORD.items())
+    assert list(rec.values()) == list(RECORD.values())
+    assert len(calls) == 2
+
+
+def test_round_trip_codes_only_exact_values():
+    record_dict = {
+        "ID": "X",
+        "ENTRYTYPE": "customtype",
+        "colrev_status": "md_processed",
+        "abstract": b"not a str",
+        "year": None,
+    }
+
+    assert_identical(CompactRecord(record_dict).to_dict(), record_dict)
+
+
+def test_round_trip_non_ascii():
+    record_dict = {"ID": "Pare2015", "author": "Paré, Guy and Trudel, Marie-Claude", "title": "–" * 300}
+
+    assert_identical(CompactRecord(record_dict).to_dict(), record_dict)
+
+
+def test_round_trip_empty_record():
+    rec = CompactRecord({})
+
+    assert rec.to_dict() == {}
+    assert len(rec) == 0
+    assert "ID" not in rec
+    with pytest.raises(KeyError):
+        rec["ID"]
+
+
+def test_setitem_delitem_pop():
+    rec = CompactRecord(RECORD)
+
+    rec["colrev_status"] = "md_processed"
+    rec["abstract"] = "short"
+    rec["note"] = "added"
+    del rec["colrev_origin"]
+    assert rec.pop("colrev_masterdata_provenance") == RECORD["colrev_masterdata_provenance"]
+    assert rec.pop("missing", None) is None
+    assert rec.setdefault("year", "1999") == "2014"
+
+    expected = dict(RECORD)
+    expected["colrev_status"] = "md_processed"
+    expected["abstract"] = "short"
+    expected["note"] = "added"
+    del expected["colrev_origin"]
+    del expected["colrev_masterdata_provenance"]
+    assert_identical(rec.to_dict(), expected)
+
+    with pytest.raises(KeyError):
+        del rec["missing"]
+
+
+def test_unused_layouts_are_released():
+    rec = CompactRecord({"ID": "A", "unique_field_1": "x"})
+    nr_layouts = len(compact_records_module._LAYOUTS)
+
+    rec["unique_field_2"] = "y"
+    del rec["unique_field_1"]
+    gc.collect()
+
+    assert len(compact_records_module._LAYOUTS) == nr_layouts
+    del rec
+    gc.collect()
+
+    assert len(compact_records_module._LAYOUTS) == nr_layouts - 1
+
+
+def test_compact_records():
+    records = {"A": dict(RECORD, ID="A"), "B": {"ID": "B", "ENTRYTYPE": "misc"}}
+    drop_fields = ["colrev_origin", "colrev_masterdata_provenance"]
+
+    compacted = compact_records(records, drop_fields=drop_fields)
+
+    assert list(compacted) == ["A", "B"]
+    assert "colrev_origin" not in compacted["A"]
+    assert expand_records(compacted)["B"] == records["B"]
+    assert list(records) == ["A", "B"]
+
+    compacted = compact_records(records, release=True)
+
+    assert records == {}
+    assert list(compacted) == ["A", "B"]
+    assert_identical(compacted["A"].to_dict(), dict(RECORD, ID="A"))
+
+
+def test_round_trip_records_bib():
+    records = colrev.loader.load_utils.load(filename=RECORDS_FILE)
+
+    expanded = expand_records(compact_records(records))
+
+    assert list(expanded) == list(records)
+    for rec_id, record_dict in records.items():
+        assert_identical(expanded[rec_id], record_dict)
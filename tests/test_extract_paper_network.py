@@ -0,0 +1,298 @@
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import colrev.writer.write_utils
+from colrev.constants import RecordState
+
+import extract_paper_network
+from extract_paper_network import (
+    CSRGraph,
+    build_graph,
+    compute_metrics,
+    doi_key,
+    extract_references,
+    get_crossref_references,
+    get_tei_references,
+    needs_extraction,
+    pagerank,
+    reference_source,
+    title_key,
+)
+
+# Synthetic fixtures for a (fictitious) 2020 review: its Crossref reference list
+# (message["reference"], named like the cache files) and the GROBID TEI of its PDF
+CROSSREF_FIXTURES = Path(__file__).parent / "data" / "crossref_references"
+TEI_FIXTURES = Path(__file__).parent / "data" / "tei"
+
+RECORDS = {
+    "SyntheticReview2020": {
+        "ID": "SyntheticReview2020",
+        "doi": "10.1234/synthetic.2020.001",
+        "title": "A synthetic review of literature reviews",
+        "file": "data/pdfs/SyntheticReview2020.pdf",
+    },
+    "Abbas2014": {
+        "ID": "Abbas2014",
+        "doi": "10.1108/ITP-12-2012-0156",
+        "title": "The regulatory considerations and ethical dilemmas of location-based services (LBS)",
+    },
+    "PareTrudelJaanaEtAl2015": {
+        "ID": "PareTrudelJaanaEtAl2015",
+        "doi": "10.1016/J.IM.2014.08.008",
+        "title": "Synthesizing information systems knowledge - A typology of literature reviews",
+    },
+    "WebsterWatson2002": {
+        "ID": "WebsterWatson2002",
+        "title": "Analyzing the Past to Prepare for the Future - Writing a Literature Review",
+    },
+    "Editorial2010": {"ID": "Editorial2010", "title": "Introduction"},
+}
+
+
+@pytest.fixture
+def crossref_cache(monkeypatch):
+    monkeypatch.setattr(extract_paper_network, "CROSSREF_CACHE_DIR", CROSSREF_FIXTURES)
+
+    def no_network(doi):
+        raise AssertionError(f"Crossref queried for {doi}")
+
+    monkeypatch.setattr(extract_paper_network, "fetch_crossref_references", no_network)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """Run in a project directory with the cached Crossref list and the TEI."""
+    shutil.copytree(CROSSREF_FIXTURES, tmp_path / "data" / "crossref_references")
+    shutil.copytree(TEI_FIXTURES, tmp_path / "data" / ".tei")
+    monkeypatch.chdir(tmp_path)
+
+    def no_network(doi):
+        raise AssertionError(f"Crossref queried for {doi}")
+
+    monkeypatch.setattr(extract_paper_network, "fetch_crossref_references", no_network)
+    return tmp_path
+
+
+def test_doi_key():
+    assert doi_key("https://doi.org/10.1016/J.IM.2014.08.008") == "10.1016/j.im.2014.08.008"
+    assert doi_key(" doi:10.2307/249542 ") == "10.2307/249542"
+    assert doi_key(None) == ""
+    assert doi_key("") == ""
+
+
+def test_title_key():
+    assert title_key("Synthesizing information systems knowledge: A typology!") == title_key(
+        "Synthesizing Information Systems Knowledge - A Typology"
+    )
+    assert title_key("Introduction") == ""
+    assert title_key(None) == ""
+
+
+def test_get_crossref_references_cache_hit(crossref_cache):
+    references = get_crossref_references(doi_key("10.1234/synthetic.2020.001"), fetch=True)
+
+    assert references[0] == (
+        "10.1016/j.im.2014.08.008",
+        title_key("Synthesizing information systems knowledge: A typology of literature reviews"),
+    )
+    assert references[1] == (
+        "",
+        title_key("Analyzing the Past to Prepare for the Future: Writing a Literature Review"),
+    )
+    assert references[2] == ("10.2307/249542", "")
+    # Unstructured references and short titles yield empty keys
+    assert references[3:] == [("", ""), ("", "")]
+
+
+def test_get_crossref_references_cache_miss(crossref_cache):
+    assert get_crossref_references("10.9999/not-cached", fetch=False) == []
+    assert get_crossref_references("", fetch=True) == []
+
+
+def test_get_tei_references(project):
+    references = get_tei_references(RECORDS["SyntheticReview2020"])
+
+    assert references == [
+        ("", title_key(RECORDS["WebsterWatson2002"]["title"])),
+        ("", ""),
+        (
+            "10.1108/itp-12-2012-0156",
+            title_key(
+                "The regulatory considerations and ethical dilemmas of location-based "
+                "services (LBS): A literature review"
+            ),
+        ),
+    ]
+    assert get_tei_references(RECORDS["Abbas2014"]) == []
+
+
+def test_extract_references(project):
+    references = extract_references(RECORDS["SyntheticReview2020"], fetch=False)
+
+    # Crossref and TEI references, without duplicates (Webster) and empty keys
+    assert references == [
+        ("10.1016/j.im.2014.08.008", title_key(RECORDS["PareTrudelJaanaEtAl2015"]["title"])),
+        ("", title_key(RECORDS["WebsterWatson2002"]["title"])),
+        ("10.2307/249542", ""),
+        get_tei_references(RECORDS["SyntheticReview2020"])[2],
+    ]
+
+
+def test_build_graph(crossref_cache):
+    references = {
+        "SyntheticReview2020": get_crossref_references(
+            doi_key(RECORDS["SyntheticReview2020"]["doi"]), fetch=False
+        ),
+        "PareTrudelJaanaEtAl2015": [
+            # Self-citation
+            ("10.1016/j.im.2014.08.008", ""),
+            ("", title_key(RECORDS["WebsterWatson2002"]["title"])),
+        ],
+    }
+
+    graph = build_graph(RECORDS, references)
+
+    ids = graph.ids.tolist()
+    assert ids == sorted(RECORDS)
+    cited = {
+        ids[i]: sorted(ids[j] for j in graph.indices[start:end])
+        for i, (start, end) in enumerate(zip(graph.indptr[:-1], graph.indptr[1:]))
+    }
+    assert cited == {
+        # DOI match and title fallback; the short title does not match Editorial2010
+        "SyntheticReview2020": ["PareTrudelJaanaEtAl2015", "WebsterWatson2002"],
+        "Abbas2014": [],
+        "Editorial2010": [],
+        "PareTrudelJaanaEtAl2015": ["WebsterWatson2002"],
+        "WebsterWatson2002": [],
+    }
+
+
+def test_build_graph_ambiguous_title():
+    title = "A Literature Review on Digital Platforms"
+    records = {
+        "A": {"title": title},
+        "B": {"title": title},
+        "C": {"title": "Another literature review"},
+    }
+    graph = build_graph(records, {"C": [("", title_key(title))]})
+
+    assert graph.nr_edges == 0
+
+
+def test_csr_graph_round_trip(tmp_path):
+    references = {
+        "PareTrudelJaanaEtAl2015": [("", title_key(RECORDS["WebsterWatson2002"]["title"]))],
+        "WebsterWatson2002": [("10.1016/j.im.2014.08.008", ""), ("10.2307/249542", "")],
+    }
+    sources = {"WebsterWatson2002": ("", "data/pdfs/WebsterWatson2002.pdf", False)}
+    graph = build_graph(RECORDS, references, sources)
+
+    graph.save(tmp_path / "paper_network.npz")
+    loaded = CSRGraph.load(tmp_path / "paper_network.npz")
+
+    assert loaded.ids.tolist() == graph.ids.tolist()
+    assert np.array_equal(loaded.indptr, graph.indptr)
+    assert np.array_equal(loaded.indices, graph.indices)
+    assert loaded.references() == {
+        "SyntheticReview2020": [],
+        "Abbas2014": [],
+        "Editorial2010": [],
+        **references,
+    }
+    assert loaded.sources()["WebsterWatson2002"] == sources["WebsterWatson2002"]
+    assert loaded.sources()["Abbas2014"] == ("", "", False)
+
+
+def test_needs_extraction(project):
+    rec = RECORDS["SyntheticReview2020"]
+    references = [("10.2307/249542", "")]
+    source = reference_source(rec)
+    assert source == ("10.1234/synthetic.2020.001", "data/pdfs/SyntheticReview2020.pdf", True)
+
+    assert needs_extraction(rec, None, None, fetch=False)
+    assert not needs_extraction(rec, references, source, fetch=True)
+    # No references were found in the same sources (do not run GROBID again)
+    assert not needs_extraction(rec, [], source, fetch=True)
+    # The TEI/PDF became available or the Crossref list was cached after the extraction
+    assert needs_extraction(rec, references, (source[0], "", True), fetch=False)
+    assert needs_extraction(rec, references, (source[0], source[1], False), fetch=False)
+    # A file that does not exist is not a source
+    assert reference_source({**rec, "file": "data/pdfs/Missing.pdf"}) == (source[0], "", True)
+
+    uncached = {"doi": "10.9999/not-cached"}
+    uncached_source = reference_source(uncached)
+    assert not needs_extraction(uncached, references, uncached_source, fetch=False)
+    assert needs_extraction(uncached, references, uncached_source, fetch=True)
+
+
+def test_pagerank():
+    # 0 -> 1, 0 -> 2, 1 -> 2; node 2 and node 3 are dangling
+    records = {rec_id: {"doi": f"10.1000/{rec_id}"} for rec_id in "ABCD"}
+    references = {"A": [("10.1000/b", ""), ("10.1000/c", "")], "B": [("10.1000/c", "")]}
+    graph = build_graph(records, references)
+
+    rank = pagerank(graph)
+
+    assert rank.sum() == pytest.approx(1.0)
+    assert rank[2] > rank[1] > rank[0]
+    assert rank[0] == pytest.approx(rank[3])
+
+    metrics = compute_metrics(graph)
+    assert metrics["in_degree"].tolist() == [0, 1, 2, 0]
+    assert metrics["out_degree"].tolist() == [2, 1, 0, 0]
+
+
+def test_pagerank_empty_graph():
+    assert pagerank(build_graph({}, {})).size == 0
+
+
+def test_main_incremental(project, monkeypatch):
+    records = {
+        rec_id: {
+            "ID": rec_id,
+            "ENTRYTYPE": "article",
+            "colrev_status": RecordState.rev_synthesized,
+            **rec,
+        }
+        for rec_id, rec in RECORDS.items()
+    }
+    colrev.writer.write_utils.write_file(records, filename=project / "data" / "records.bib")
+    monkeypatch.setattr(sys, "argv", ["extract_paper_network.py"])
+
+    extract_paper_network.main()
+
+    graph = CSRGraph.load(project / "data" / "paper_network.npz")
+    assert graph.nr_edges == 3
+    metrics = (project / "data" / "paper_network_metrics.csv").read_text(encoding="utf-8")
+    assert metrics.startswith("ID,in_degree,out_degree,pagerank")
+    assert len(metrics.splitlines()) == len(RECORDS) + 1
+
+    # Stored references are up to date (including the empty ones)
+    extracted = []
+
+    def record_extraction(rec, fetch):
+        extracted.append(rec["ID"])
+        return [("10.1108/itp-12-2012-0156", "")]
+
+    monkeypatch.setattr(extract_paper_network, "extract_references", record_extraction)
+    extract_paper_network.main()
+
+    assert extracted == []
+    assert CSRGraph.load(project / "data" / "paper_network.npz").references() == graph.references()
+
+    # Only records with new sources are extracted again
+    (project / "data" / ".tei" / "WebsterWatson2002.tei.xml").write_bytes(
+        (TEI_FIXTURES / "SyntheticReview2020.tei.xml").read_bytes()
+    )
+    records["WebsterWatson2002"]["file"] = "data/pdfs/WebsterWatson2002.pdf"
+    colrev.writer.write_utils.write_file(records, filename=project / "data" / "records.bib")
+
+    extract_paper_network.main()
+
+    assert extracted == ["WebsterWatson2002"]
+    assert CSRGraph.load(project / "data" / "paper_network.npz").nr_edges == 4